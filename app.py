@@ -1,286 +1,129 @@
 import streamlit as st
-import sqlite3
 import os
-import datetime
-import pandas as pd
-import json
-import PyPDF2
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-import io
-from groq import Groq
-
-api_key = st.secrets["GROQ_API_KEY"]
-
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=GROQ_API_KEY)
-
-# Set up templates directory
-TEMPLATES_DIR = os.path.join(os.getcwd(), "templates")
-if not os.path.exists(TEMPLATES_DIR):
-    os.makedirs(TEMPLATES_DIR)
-
-# Database connection and initialization
-def get_db_connection():
-    conn = sqlite3.connect("leave_management.db", timeout=10, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL;")
-    return conn
-
-def initialize_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS leave_requests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id TEXT,
-            mentor_id TEXT,
-            days INTEGER,
-            start_date TEXT DEFAULT CURRENT_DATE,
-            end_date TEXT,
-            status TEXT CHECK(status IN ('pending', 'approved', 'rejected'))
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS mentor_assignments (
-            student_id TEXT PRIMARY KEY,
-            mentor_id TEXT
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS academic_docs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            content TEXT
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS certificate_templates (
-            template_type TEXT PRIMARY KEY,
-            file_path TEXT
-        )
-    """)
-
-    conn.commit()
-    conn.close()
-
-initialize_db()
+import hashlib
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# All DB access, AI calls and certificate rendering live in backend.py; this app only talks to its API
+BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:5000").rstrip("/")
+REQUEST_TIMEOUT = (3.05, 60)  # (connect, read) seconds; /academic waits on the LLM
+
+# One keep-alive session per Streamlit server process, shared by all reruns and sessions
+@st.cache_resource
+def get_api_session():
+    session = requests.Session()
+    # Only idempotent requests are retried, so a leave submission is never sent twice
+    retries = Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504), allowed_methods=frozenset({"GET"}))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def call_api(method, path, **kwargs):
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    return get_api_session().request(method, f"{BACKEND_URL}{path}", **kwargs)
+
+def api_message(response):
+    try:
+        return response.json().get("message", response.reason)
+    except ValueError:
+        return f"Backend error {response.status_code}: {response.reason}"
 
-# ---- Backend Logic Functions ----
+# ---- Backend API Client ----
 
 def assign_mentor(student_id, mentor_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR REPLACE INTO mentor_assignments (student_id, mentor_id) VALUES (?, ?)", (student_id, mentor_id))
-    conn.commit()
-    conn.close()
+    try:
+        response = call_api("POST", "/assign-mentor", json={"student_id": student_id, "mentor_id": mentor_id})
+    except requests.RequestException as e:
+        return False, f"Backend unreachable: {str(e)}"
+    return response.ok, api_message(response)
 
 def process_leave_request(student_id, days):
-    start_date = datetime.date.today().strftime("%Y-%m-%d")
-    end_date = (datetime.date.today() + datetime.timedelta(days=days)).strftime("%Y-%m-%d")
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT mentor_id FROM mentor_assignments WHERE student_id = ?", (student_id,))
-    mentor = cursor.fetchone()
-
-    if days <= 5:
-        status = "approved"
-        mentor_id = "Auto-Approved"
-    elif mentor:
-        status = "pending"
-        mentor_id = mentor["mentor_id"]
-    else:
-        conn.close()
-        return False, "No mentor found for this student."
-
-    cursor.execute("""
-        INSERT INTO leave_requests (student_id, mentor_id, days, start_date, end_date, status)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (student_id, mentor_id, days, start_date, end_date, status))
-
-    conn.commit()
-    conn.close()
-
-    return True, f"Leave request for {days} days sent to {mentor_id}. Status: {status}."
+    try:
+        response = call_api("POST", "/leave", json={"student_id": student_id, "days": int(days)})
+    except requests.RequestException as e:
+        return False, f"Backend unreachable: {str(e)}"
+    if response.ok:
+        fetch_student_leaves.clear()
+        fetch_mentor_pending.clear()
+    return response.ok, api_message(response)
+
+# Short-lived caches spare a round trip on unrelated widget reruns; our own writes clear them.
+# They raise on failure so an error is never cached; the wrappers below turn it into (ok, message).
+@st.cache_data(ttl=30)
+def fetch_student_leaves(student_id):
+    response = call_api("GET", "/student-leave-status", params={"student_id": student_id})
+    response.raise_for_status()
+    return response.json()["requests"]
+
+@st.cache_data(ttl=30)
+def fetch_mentor_pending(mentor_id):
+    response = call_api("GET", "/mentor-leave-requests", params={"mentor_id": mentor_id})
+    response.raise_for_status()
+    return response.json()["requests"]
 
 def get_student_leave_status(student_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT mentor_id, days, start_date, end_date, status FROM leave_requests WHERE student_id = ?", (student_id,))
-    requests = cursor.fetchall()
-    conn.close()
-    return [dict(r) for r in requests]
+    try:
+        return True, fetch_student_leaves(student_id)
+    except requests.RequestException as e:
+        return False, f"Could not load leave requests: {str(e)}"
 
 def get_mentor_leave_requests(mentor_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, student_id, days, start_date, end_date, status FROM leave_requests WHERE mentor_id = ? AND status = 'pending'", (mentor_id,))
-    requests = cursor.fetchall()
-    conn.close()
-    return [dict(r) for r in requests]
-
-def approve_leave_request(leave_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE leave_requests SET status = 'approved' WHERE id = ?", (leave_id,))
-    conn.commit()
-    conn.close()
-
-def reject_leave_request(leave_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE leave_requests SET status = 'rejected' WHERE id = ?", (leave_id,))
-    conn.commit()
-    conn.close()
+    try:
+        return True, fetch_mentor_pending(mentor_id)
+    except requests.RequestException as e:
+        return False, f"Could not load leave requests: {str(e)}"
 
+# Applies several approve/reject decisions in one round trip; returns the backend's result
+# ("message", "applied" and the refreshed pending "requests")
+def decide_leave_requests(mentor_id, decisions):
+    try:
+        response = call_api("POST", "/leave-decisions", json={"mentor_id": mentor_id, "decisions": decisions})
+    except requests.RequestException as e:
+        return False, f"Backend unreachable: {str(e)}"
+    if not response.ok:
+        return False, api_message(response)
+    fetch_student_leaves.clear()
+    fetch_mentor_pending.clear()
+    return True, response.json()
+
+# Returns (ok, message, final); final is False only for failures worth retrying (network errors, 5xx)
 def upload_ai_training_data(file):
-    filename = file.name
-    conn = get_db_connection()
-    cursor = conn.cursor()
     try:
-        if filename.endswith(".csv") or filename.endswith(".xlsx"):
-            df = pd.read_csv(file) if filename.endswith(".csv") else pd.read_excel(file)
-            for _, row in df.iterrows():
-                cursor.execute("INSERT INTO academic_docs (content) VALUES (?)", (json.dumps(row.to_dict()),))
-            conn.commit()
-
-        elif filename.endswith(".json"):
-            data = json.load(file)
-            cursor.execute("INSERT INTO academic_docs (content) VALUES (?)", (json.dumps(data),))
-            conn.commit()
-
-        elif filename.endswith(".pdf"):
-            reader = PyPDF2.PdfReader(file)
-            text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
-            cursor.execute("INSERT INTO academic_docs (content) VALUES (?)", (text,))
-            conn.commit()
-        else:
-            conn.close()
-            return False, "Invalid file format. Supported formats: CSV, XLSX, JSON, PDF"
-
-        conn.close()
-        return True, "AI Training Data Uploaded Successfully."
-
-    except Exception as e:
-        conn.close()
-        return False, f"Error processing file: {str(e)}"
+        response = call_api("POST", "/upload-data", files={"file": (file.name, file.getvalue(), file.type)})
+    except requests.RequestException as e:
+        return False, f"Backend unreachable: {str(e)}", False
+    return response.ok, api_message(response), response.status_code < 500
 
 def academic_query(query):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT content FROM academic_docs")
-    documents = cursor.fetchall()
-    conn.close()
-
-    if not documents:
-        return "No academic data available. Please upload training data."
-
-    knowledge_base = " ".join([doc[0] for doc in documents])[:4000]
-
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are a helpful academic assistant."},
-                {"role": "user", "content": f"{query}\n\nContext:\n{knowledge_base}"}
-            ],
-            model="llama-3.3-70b-versatile",
-        )
-
-        ai_response = chat_completion.choices[0].message.content
-        return ai_response
-
-    except Exception as e:
+        response = call_api("POST", "/academic", json={"student_id": st.session_state["username"], "query": query})
+        response.raise_for_status()
+    except requests.RequestException as e:
         return f"AI Error: {str(e)}"
+    return response.json()["response"]
 
 def set_certificate_template(template_type, template_file):
-    template_filename = f"{template_type.lower()}_template.pdf"
-    template_path = os.path.join(TEMPLATES_DIR, template_filename)
-    with open(template_path, "wb") as f:
-        f.write(template_file.getbuffer())
-
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT OR REPLACE INTO certificate_templates (template_type, file_path) VALUES (?, ?)",
-        (template_type, template_path)
-    )
-    conn.commit()
-    conn.close()
+    try:
+        response = call_api(
+            "POST",
+            "/set-template",
+            files={"template": (template_file.name, template_file.getvalue(), "application/pdf")},
+            data={"template_type": template_type},
+        )
+    except requests.RequestException as e:
+        return False, f"Backend unreachable: {str(e)}"
+    return response.ok, api_message(response)
 
 def generate_certificate(student_id, cert_type):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT file_path FROM certificate_templates WHERE template_type = ?", (cert_type,))
-    template_record = cursor.fetchone()
-    conn.close()
-
-    filename = f"{student_id}_{cert_type.lower()}_certificate.pdf"
-    filepath = os.path.join(os.getcwd(), filename)
-
-    if template_record and os.path.exists(template_record["file_path"]):
-        # Use the stored template to create certificate with overlay
-        template_path = template_record["file_path"]
-        reader = PyPDF2.PdfReader(template_path)
-        writer = PyPDF2.PdfWriter()
-        page = reader.pages[0]
-
-        # Create overlay PDF with data
-        overlay_bytes = io.BytesIO()
-        c = canvas.Canvas(overlay_bytes, pagesize=letter)
-        c.setFont("Helvetica", 12)
-        c.drawString(100, 400, f"Student ID: {student_id}")
-        c.drawString(100, 380, f"Certificate Type: {cert_type}")
-        current_date = datetime.date.today().strftime("%d-%m-%Y")
-        c.drawString(100, 360, f"Date Issued: {current_date}")
-        c.save()
-
-        overlay_bytes.seek(0)
-        overlay_pdf = PyPDF2.PdfReader(overlay_bytes)
-        page.merge_page(overlay_pdf.pages[0])
-        writer.add_page(page)
-
-        with open(filepath, "wb") as output_file:
-            writer.write(output_file)
-    else:
-        # Generate a simple certificate from scratch
-        c = canvas.Canvas(filepath, pagesize=letter)
-        c.setTitle(f"{cert_type} Certificate")
-        c.setFont("Helvetica-Bold", 24)
-        c.drawCentredString(300, 750, "ACADEMIC INSTITUTION")
-        c.setFont("Helvetica-Bold", 22)
-        c.drawCentredString(300, 700, f"{cert_type} Certificate")
-
-        c.setFont("Helvetica", 14)
-        current_date = datetime.date.today().strftime("%d-%m-%Y")
-
-        if cert_type.lower() == "bonafide":
-            c.drawString(50, 600, f"This is to certify that {student_id} is a bonafide student")
-            c.drawString(50, 580, "of our institution and is currently pursuing their education with us.")
-        elif cert_type.lower() == "noc":
-            c.drawString(50, 600, f"This is to certify that {student_id} is granted a No Objection")
-            c.drawString(50, 580, "Certificate for their intended activities outside the institution.")
-
-        c.drawString(50, 400, f"Date: {current_date}")
-        c.drawString(400, 400, "Signature")
-        c.drawString(400, 380, "________________")
-        c.drawString(400, 360, "Principal")
-
-        c.rect(20, 20, 555, 800, stroke=1, fill=0)
-
-        c.save()
-
-    with open(filepath, "rb") as f:
-        pdf_bytes = f.read()
-
-    # Clean up after reading
-    if os.path.exists(filepath):
-        os.remove(filepath)
-
-    return pdf_bytes
+    try:
+        response = call_api("POST", "/certificate", json={"student_id": student_id, "cert_type": cert_type})
+    except requests.RequestException as e:
+        return False, f"Backend unreachable: {str(e)}"
+    if not response.ok:
+        return False, api_message(response)
+    return True, response.content
 
 # ---- Streamlit UI ----
 
@@ -322,27 +165,43 @@ if st.session_state["role"] == "student":
                 answer = academic_query(query)
             st.markdown(f"**Answer:** {answer}")
 
-    st.header("📝 Request Leave")
-    leave_days = st.number_input("Number of leave days:", min_value=1, max_value=30, step=1)
-    if st.button("Submit Leave Request"):
-        success, message = process_leave_request(st.session_state["username"], leave_days)
-        if success:
-            st.success(message)
+    # Submitting a leave only reruns this fragment, not the whole dashboard
+    @st.fragment
+    def student_leave_panel(student_id):
+        st.header("📝 Request Leave")
+        leave_days = st.number_input("Number of leave days:", min_value=1, max_value=30, step=1)
+        if st.button("Submit Leave Request"):
+            success, message = process_leave_request(student_id, leave_days)
+            if success:
+                st.success(message)
+            else:
+                st.error(message)
+
+        st.header("📌 Your Leave Requests")
+        success, leave_requests = get_student_leave_status(student_id)
+        if not success:
+            st.error(leave_requests)
+        elif leave_requests:
+            for lr in leave_requests:
+                st.write(f"- Days: {lr['days']}, From: {lr['start_date']} To: {lr['end_date']}, Status: {lr['status']} (Mentor: {lr['mentor_id']})")
         else:
-            st.error(message)
+            st.write("No leave requests found.")
 
-    st.header("📌 Your Leave Requests")
-    leave_requests = get_student_leave_status(st.session_state["username"])
-    if leave_requests:
-        for lr in leave_requests:
-            st.write(f"- Days: {lr['days']}, From: {lr['start_date']} To: {lr['end_date']}, Status: {lr['status']} (Mentor: {lr['mentor_id']})")
-    else:
-        st.write("No leave requests found.")
+    student_leave_panel(st.session_state["username"])
 
     st.header("📤 Upload Academic Training Data")
     file = st.file_uploader("Upload CSV, XLSX, JSON, or PDF file for AI training data:")
     if file is not None:
-        success, msg = upload_ai_training_data(file)
+        # Ingest each distinct file once; later reruns replay the stored outcome, including a
+        # rejection such as an unsupported format. Only unreachable-backend and 5xx failures are retried.
+        uploaded = st.session_state.setdefault("uploaded_files", {})
+        file_hash = hashlib.sha256(file.getvalue()).hexdigest()
+        if file_hash in uploaded:
+            success, msg = uploaded[file_hash]
+        else:
+            success, msg, final = upload_ai_training_data(file)
+            if final:
+                uploaded[file_hash] = (success, msg)
         if success:
             st.success(msg)
         else:
@@ -351,31 +210,69 @@ if st.session_state["role"] == "student":
     st.header("📄 Generate Certificate")
     cert_type = st.selectbox("Select certificate type:", ["Bonafide", "NOC"])
     if st.button("Generate Certificate"):
-        pdf_bytes = generate_certificate(st.session_state["username"], cert_type)
-        st.download_button(
-            label=f"Download {cert_type} Certificate",
-            data=pdf_bytes,
-            file_name=f"{cert_type}_{st.session_state['username']}.pdf",
-            mime="application/pdf"
-        )
+        success, pdf_bytes = generate_certificate(st.session_state["username"], cert_type)
+        if success:
+            st.download_button(
+                label=f"Download {cert_type} Certificate",
+                data=pdf_bytes,
+                file_name=f"{cert_type}_{st.session_state['username']}.pdf",
+                mime="application/pdf"
+            )
+        else:
+            st.error(pdf_bytes)
 
 # Mentor Dashboard
 elif st.session_state["role"] == "mentor":
     st.header("📝 Leave Requests from Students")
-    mentor_id = st.session_state["username"]
-    requests = get_mentor_leave_requests(mentor_id)
-    if requests:
-        for req in requests:
-            st.write(f"Student: {req['student_id']} - Days: {req['days']}, From: {req['start_date']} To: {req['end_date']}")
+
+    # Approve/reject clicks rerun only the mentor list
+    @st.fragment
+    def mentor_leave_panel(mentor_id):
+        # Outcome of the decision that triggered this rerun; a warning when some matched no pending leave
+        outcome = st.session_state.pop("mentor_decision_outcome", None)
+        if outcome is not None:
+            all_applied, message = outcome
+            if all_applied:
+                st.success(message)
+            else:
+                st.warning(message)
+
+        # A decision's response already carries the refreshed list, so reuse it instead of refetching
+        pending = st.session_state.pop("mentor_pending", None)
+        if pending is None:
+            success, pending = get_mentor_leave_requests(mentor_id)
+            if not success:
+                st.error(pending)
+                return
+        if pending:
+            decisions = []
+            for req in pending:
+                st.write(f"Student: {req['student_id']} - Days: {req['days']}, From: {req['start_date']} To: {req['end_date']}")
+                cols = st.columns(3)
+                cols[0].checkbox("Select", key=f"select_{req['id']}")
+                if cols[1].button(f"Approve {req['id']}"):
+                    decisions = [{"leave_id": req["id"], "status": "approved"}]
+                if cols[2].button(f"Reject {req['id']}"):
+                    decisions = [{"leave_id": req["id"], "status": "rejected"}]
+
+            selected = [req["id"] for req in pending if st.session_state.get(f"select_{req['id']}")]
             cols = st.columns(2)
-            if cols[0].button(f"Approve {req['id']}"):
-                approve_leave_request(req['id'])
-                st.experimental_rerun()
-            if cols[1].button(f"Reject {req['id']}"):
-                reject_leave_request(req['id'])
-                st.experimental_rerun()
-    else:
-        st.write("No pending leave requests.")
+            if cols[0].button("Approve selected", disabled=not selected):
+                decisions = [{"leave_id": leave_id, "status": "approved"} for leave_id in selected]
+            if cols[1].button("Reject selected", disabled=not selected):
+                decisions = [{"leave_id": leave_id, "status": "rejected"} for leave_id in selected]
+
+            if decisions:
+                success, result = decide_leave_requests(mentor_id, decisions)
+                if success:
+                    st.session_state["mentor_pending"] = result["requests"]
+                    st.session_state["mentor_decision_outcome"] = (result["applied"] == len(decisions), result["message"])
+                    st.rerun(scope="fragment")
+                st.error(result)
+        else:
+            st.write("No pending leave requests.")
+
+    mentor_leave_panel(st.session_state["username"])
 
 # Admin Dashboard for mentor assignment & template upload
 elif st.session_state["role"] == "admin":
@@ -384,8 +281,11 @@ elif st.session_state["role"] == "admin":
     mentor_id = st.text_input("Mentor ID:")
     if st.button("Assign Mentor"):
         if student_id and mentor_id:
-            assign_mentor(student_id, mentor_id)
-            st.success(f"Mentor {mentor_id} assigned to student {student_id}.")
+            success, msg = assign_mentor(student_id, mentor_id)
+            if success:
+                st.success(f"Mentor {mentor_id} assigned to student {student_id}.")
+            else:
+                st.error(msg)
         else:
             st.error("Please provide both Student ID and Mentor ID.")
 
@@ -395,8 +295,11 @@ elif st.session_state["role"] == "admin":
     if template_file is not None:
         if st.button("Upload Template"):
             if template_file.type == "application/pdf":
-                set_certificate_template(template_type, template_file)
-                st.success(f"{template_type} certificate template uploaded successfully.")
+                success, msg = set_certificate_template(template_type, template_file)
+                if success:
+                    st.success(f"{template_type} certificate template uploaded successfully.")
+                else:
+                    st.error(msg)
             else:
                 st.error("Please upload a PDF file.")
 
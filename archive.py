@@ -0,0 +1,192 @@
+# Hot/cold archival of closed leave requests.
+#
+#   python archive.py --cutoff-days 180
+#
+# Approved/rejected requests whose end_date is older than the cutoff are moved
+# from the hot database into its archive (leave_management.db -> leave_management_archive.db
+# unless LEAVE_ARCHIVE_DB_PATH says otherwise), then the hot database is analyzed,
+# vacuumed (when enough pages are free) and its WAL checkpointed. Only one job runs at
+# a time per archive (file lock). Student history queries read both databases through
+# STUDENT_HISTORY_SQL.
+import argparse
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+LEAVE_COLUMNS = "id, student_id, mentor_id, days, start_date, end_date, status"
+
+STUDENT_HISTORY_SQL = """
+    SELECT mentor_id, days, start_date, end_date, status FROM (
+        SELECT id, mentor_id, days, start_date, end_date, status FROM archive.leave_requests WHERE student_id = ?
+        UNION ALL
+        SELECT id, mentor_id, days, start_date, end_date, status FROM main.leave_requests WHERE student_id = ?
+    ) ORDER BY id
+"""
+
+
+# Each hot database gets its own archive next to it, so a scratch or benchmark database
+# never shares (and mixes rows with) the production archive
+def archive_path_for(db_path):
+    override = os.getenv("LEAVE_ARCHIVE_DB_PATH")
+    if override:
+        return override
+    stem, _ = os.path.splitext(db_path)
+    return f"{stem}_archive.db"
+
+
+def attach_archive(conn, archive_path):
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+
+
+def initialize_archive(conn):
+    conn.execute("PRAGMA archive.journal_mode=WAL;")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive.leave_requests (
+            id INTEGER PRIMARY KEY,
+            student_id TEXT,
+            mentor_id TEXT,
+            days INTEGER,
+            start_date TEXT,
+            end_date TEXT,
+            status TEXT CHECK(status IN ('approved', 'rejected')),
+            archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_archived_leave_student ON leave_requests (student_id)")
+    conn.commit()
+
+
+def archive_closed_leaves(conn, cutoff_date, batch_size=500):
+    # Ids are AUTOINCREMENT in the hot table, so they are never reused and stay unique across both databases.
+    # Short batches keep the write lock free for live /leave traffic between them.
+    # A commit spanning attached WAL databases is not atomic, so each batch is copied and committed
+    # first, and only rows already present in the archive are deleted in a second transaction.
+    cutoff = cutoff_date.strftime("%Y-%m-%d")
+    moved = 0
+    while True:
+        with span("sql", "archive_batch"):
+            ids = [row[0] for row in conn.execute("""
+                SELECT id FROM main.leave_requests
+                WHERE status IN ('approved', 'rejected') AND end_date < ?
+                ORDER BY id LIMIT ?
+            """, (cutoff, batch_size))]
+            if not ids:
+                break
+            placeholders = ",".join("?" * len(ids))
+            # OR IGNORE keeps a rerun idempotent if a crash left a batch copied but not yet deleted
+            conn.execute(f"""
+                INSERT OR IGNORE INTO archive.leave_requests ({LEAVE_COLUMNS})
+                SELECT {LEAVE_COLUMNS} FROM main.leave_requests WHERE id IN ({placeholders})
+            """, ids)
+            conn.commit()
+            conn.execute(f"""
+                DELETE FROM main.leave_requests
+                WHERE id IN ({placeholders}) AND id IN (SELECT id FROM archive.leave_requests)
+            """, ids)
+            conn.commit()
+        moved += len(ids)
+    return moved
+
+
+def run_maintenance(conn, vacuum=True, vacuum_free_ratio=0.2):
+    with span("sql", "analyze"):
+        conn.execute("ANALYZE main")
+        conn.execute("ANALYZE archive")
+    # VACUUM holds the write lock for its whole run, so only pay for it when enough pages are free
+    page_count = conn.execute("PRAGMA main.page_count").fetchone()[0]
+    free_pages = conn.execute("PRAGMA main.freelist_count").fetchone()[0]
+    if vacuum and page_count and free_pages / page_count >= vacuum_free_ratio:
+        with span("sql", "vacuum"):
+            conn.execute("VACUUM main")
+    with span("sql", "wal_checkpoint"):
+        conn.execute("PRAGMA main.wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA archive.wal_checkpoint(TRUNCATE)")
+
+
+# Non-blocking exclusive lock; returns the open file (keep it to hold the lock) or None if another process has it.
+# The platform modules are imported here so that importing archive (as backend.py does) works everywhere.
+def try_lock(path):
+    lock_file = open(path, "a")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+# Returns the number of rows moved, or None if another archive job (cron or a worker) is already running
+def run_archive_job(db_path, archive_path=None, cutoff_days=180, vacuum=True):
+    archive_path = archive_path or archive_path_for(db_path)
+    job_lock = try_lock(archive_path + ".lock")
+    if job_lock is None:
+        return None
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+        attach_archive(conn, archive_path)
+        initialize_archive(conn)
+        cutoff = datetime.date.today() - datetime.timedelta(days=cutoff_days)
+        moved = archive_closed_leaves(conn, cutoff)
+        run_maintenance(conn, vacuum=vacuum)
+        return moved
+    finally:
+        conn.close()
+        job_lock.close()
+
+
+# Every gunicorn worker calls this, but only the one that wins the leader lock runs the
+# schedule, so there is never more than one archiver (and one VACUUM) per database.
+def start_archiver(db_path, archive_path=None, cutoff_days=180, interval_hours=24.0, vacuum=True):
+    archive_path = archive_path or archive_path_for(db_path)
+    leader_lock = try_lock(archive_path + ".leader")
+    if leader_lock is None:
+        return None
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval_hours * 3600):
+            try:
+                moved = run_archive_job(db_path, archive_path, cutoff_days, vacuum)
+                if moved is not None:
+                    logger.info("Archived %d closed leave requests", moved)
+            except Exception:
+                # Keep the schedule alive: this thread holds the leader lock, so no other worker would take over
+                logger.exception("Leave archival job failed")
+
+        leader_lock.close()
+
+    threading.Thread(target=loop, name="leave-archiver", daemon=True).start()
+    return stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move closed leave requests older than the cutoff into the archive database.")
+    parser.add_argument("--db", default=os.getenv("LEAVE_DB_PATH", "leave_management.db"))
+    parser.add_argument("--archive-db", help="Archive database (default: <db stem>_archive.db or LEAVE_ARCHIVE_DB_PATH)")
+    parser.add_argument("--cutoff-days", type=int, default=180, help="Archive requests that ended more than this many days ago")
+    parser.add_argument("--no-vacuum", action="store_true", help="Skip VACUUM (ANALYZE and WAL checkpoint still run)")
+    args = parser.parse_args()
+
+    archive_db = args.archive_db or archive_path_for(args.db)
+    moved = run_archive_job(args.db, archive_db, args.cutoff_days, vacuum=not args.no_vacuum)
+    if moved is None:
+        print(f"❌ Another archive job holds {archive_db}.lock; skipping this run")
+        return
+    print(f"✅ Archived {moved} closed leave requests into {archive_db}")
+
+
+if __name__ == "__main__":
+    main()
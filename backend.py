@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, abort, make_response
 import sqlite3
 import os
 import datetime
@@ -8,9 +8,13 @@ import time
 import PyPDF2
 from dotenv import load_dotenv
 from groq import Groq
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
 import io
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import metrics
+from metrics import span
+from write_queue import GroupCommitWriter
+from certificates import generate_certificate_pdf
+from archive import STUDENT_HISTORY_SQL, archive_path_for, attach_archive, initialize_archive, start_archiver
 
 # Load environment variables
 load_dotenv()
@@ -18,20 +22,32 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 # Initialize Flask App & Groq Client
 app = Flask(__name__)
-client = Groq(api_key=GROQ_API_KEY)
+metrics.init_app(app)
+# GROQ_MAX_RETRIES=0 lets benchmarks see every upstream failure instead of the SDK's silent retries
+client = Groq(api_key=GROQ_API_KEY, max_retries=int(os.getenv("GROQ_MAX_RETRIES", "2")))
 
-# Create templates directory if it doesn't exist
-TEMPLATES_DIR = os.path.join(os.getcwd(), "templates")
+# Create templates directory if it doesn't exist (overridable so benchmarks don't overwrite real templates)
+TEMPLATES_DIR = os.getenv("LEAVE_TEMPLATES_DIR", os.path.join(os.getcwd(), "templates"))
 if not os.path.exists(TEMPLATES_DIR):
     os.makedirs(TEMPLATES_DIR)
 
+# Overridable so benchmarks can run against a scratch database
+DB_PATH = os.getenv("LEAVE_DB_PATH", "leave_management.db")
+ARCHIVE_DB_PATH = archive_path_for(DB_PATH)
+
 # ✅ Database Connection
 def get_db_connection():
-    conn = sqlite3.connect("leave_management.db", timeout=10, check_same_thread=False)
+    conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL;")
     return conn
 
+# Only student history reads the archive, so only its connections pay for the ATTACH
+def get_history_connection():
+    conn = get_db_connection()
+    attach_archive(conn, ARCHIVE_DB_PATH)
+    return conn
+
 # ✅ Create Tables If Not Exists
 def initialize_db():
     conn = get_db_connection()
@@ -72,10 +88,68 @@ def initialize_db():
     """)
 
     conn.commit()
+    attach_archive(conn, ARCHIVE_DB_PATH)
+    initialize_archive(conn)
     conn.close()
 
 initialize_db()
 
+# Optional in-process archival; running archive.py from cron does the same job.
+# Only one worker wins the archiver's leader lock, so -w N still runs a single archiver.
+if os.getenv("LEAVE_ARCHIVE_INTERVAL_HOURS"):
+    start_archiver(
+        DB_PATH,
+        ARCHIVE_DB_PATH,
+        cutoff_days=int(os.getenv("LEAVE_ARCHIVE_CUTOFF_DAYS", "180")),
+        interval_hours=float(os.getenv("LEAVE_ARCHIVE_INTERVAL_HOURS")),
+    )
+
+# Optional write-behind mode: leave inserts and status updates from concurrent
+# requests are grouped into one commit per LEAVE_WRITE_WINDOW_MS window. The queue is
+# per process, so it needs threaded workers (gunicorn --worker-class gthread --threads N);
+# sync workers serve one request at a time and never have a second write to group.
+if os.getenv("LEAVE_WRITE_BATCHING") == "1":
+    write_queue = GroupCommitWriter(DB_PATH, window_ms=float(os.getenv("LEAVE_WRITE_WINDOW_MS", "5")))
+else:
+    write_queue = None
+
+sync_worker_warned = False
+
+def wait_for_queued_write(future):
+    global sync_worker_warned
+    if not sync_worker_warned and not request.environ.get("wsgi.multithread"):
+        sync_worker_warned = True
+        app.logger.warning("LEAVE_WRITE_BATCHING is on but this worker is single-threaded, so writes are never grouped; "
+                           "run gunicorn with --worker-class gthread --threads N")
+    try:
+        return future.result(timeout=10)
+    except FutureTimeoutError:
+        # A queued write that outlives its wait is not lost: it may still commit, so a blind
+        # client retry would create a duplicate. Answer with a distinct status instead of a 500.
+        abort(make_response(jsonify({"message": "⏳ The write is still queued and may yet be saved. Check its status before resubmitting."}), 504))
+
+def execute_write(conn, sql, params, operation):
+    with span("sql", operation):
+        if write_queue is not None:
+            return wait_for_queued_write(write_queue.submit(sql, params))
+        cursor = conn.execute(sql, params)
+        conn.commit()
+        return cursor.lastrowid
+
+# Applies every parameter set in one transaction (one queued unit when batching) and returns the rows changed
+def execute_writes(conn, sql, params_list, operation):
+    with span("sql", operation):
+        if write_queue is not None:
+            return wait_for_queued_write(write_queue.submit_many(sql, params_list))
+        cursor = conn.executemany(sql, params_list)
+        conn.commit()
+        return cursor.rowcount
+
+def fetch_mentor_pending(conn, mentor_id):
+    with span("sql", "select_mentor_pending"):
+        rows = conn.execute("SELECT id, student_id, days, start_date, end_date, status FROM leave_requests WHERE mentor_id = ? AND status = 'pending'", (mentor_id,)).fetchall()
+    return [dict(row) for row in rows]
+
 # ✅ Assign Mentor API
 @app.route("/assign-mentor", methods=["POST"])
 def assign_mentor():
@@ -85,8 +159,9 @@ def assign_mentor():
 
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("INSERT OR REPLACE INTO mentor_assignments (student_id, mentor_id) VALUES (?, ?)", (student_id, mentor_id))
-    conn.commit()
+    with span("sql", "assign_mentor"):
+        cursor.execute("INSERT OR REPLACE INTO mentor_assignments (student_id, mentor_id) VALUES (?, ?)", (student_id, mentor_id))
+        conn.commit()
     conn.close()
 
     return jsonify({"message": f"✅ Assigned Mentor {mentor_id} to Student {student_id}."})
@@ -102,8 +177,9 @@ def process_leave():
 
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT mentor_id FROM mentor_assignments WHERE student_id = ?", (student_id,))
-    mentor = cursor.fetchone()
+    with span("sql", "select_mentor"):
+        cursor.execute("SELECT mentor_id FROM mentor_assignments WHERE student_id = ?", (student_id,))
+        mentor = cursor.fetchone()
 
     if days <= 5:
         status = "approved"
@@ -115,25 +191,27 @@ def process_leave():
         conn.close()
         return jsonify({"message": "❌ No mentor found for this student."}), 400
 
-    cursor.execute("""
+    leave_id = execute_write(conn, """
         INSERT INTO leave_requests (student_id, mentor_id, days, start_date, end_date, status)
         VALUES (?, ?, ?, ?, ?, ?)
-    """, (student_id, mentor_id, days, start_date, end_date, status))
-
-    conn.commit()
+    """, (student_id, mentor_id, days, start_date, end_date, status), "insert_leave")
     conn.close()
 
-    return jsonify({"message": f"✅ Leave request for {days} days sent to {mentor_id}. Status: {status}."})
+    return jsonify({
+        "message": f"✅ Leave request for {days} days sent to {mentor_id}. Status: {status}.",
+        "leave_id": leave_id,
+    })
 
 # ✅ Fetch Student Leave Requests
 @app.route("/student-leave-status", methods=["GET"])
 def student_leave_status():
     student_id = request.args.get("student_id")
 
-    conn = get_db_connection()
+    conn = get_history_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT mentor_id, days, start_date, end_date, status FROM leave_requests WHERE student_id = ?", (student_id,))
-    requests = cursor.fetchall()
+    with span("sql", "select_student_leaves"):
+        cursor.execute(STUDENT_HISTORY_SQL, (student_id, student_id))
+        requests = cursor.fetchall()
     conn.close()
 
     return jsonify({"requests": [dict(req) for req in requests]})
@@ -144,12 +222,10 @@ def mentor_leave_requests():
     mentor_id = request.args.get("mentor_id")
 
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, student_id, days, start_date, end_date, status FROM leave_requests WHERE mentor_id = ? AND status = 'pending'", (mentor_id,))
-    requests = cursor.fetchall()
+    requests = fetch_mentor_pending(conn, mentor_id)
     conn.close()
 
-    return jsonify({"requests": [dict(req) for req in requests]})
+    return jsonify({"requests": requests})
 
 # ✅ Approve Leave (Mentor Action)
 @app.route("/approve-leave", methods=["POST"])
@@ -158,9 +234,7 @@ def approve_leave():
     leave_id = data["leave_id"]
 
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE leave_requests SET status = 'approved' WHERE id = ?", (leave_id,))
-    conn.commit()
+    execute_write(conn, "UPDATE leave_requests SET status = 'approved' WHERE id = ?", (leave_id,), "approve_leave")
     conn.close()
 
     return jsonify({"message": "✅ Leave request approved."})
@@ -172,13 +246,40 @@ def reject_leave():
     leave_id = data["leave_id"]
 
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE leave_requests SET status = 'rejected' WHERE id = ?", (leave_id,))
-    conn.commit()
+    execute_write(conn, "UPDATE leave_requests SET status = 'rejected' WHERE id = ?", (leave_id,), "reject_leave")
     conn.close()
 
     return jsonify({"message": "❌ Leave request rejected."})
 
+# ✅ Batch Approve/Reject (Mentor Action), returns the refreshed pending list in the same round trip
+@app.route("/leave-decisions", methods=["POST"])
+def leave_decisions():
+    data = request.json
+    mentor_id = data["mentor_id"]
+    decisions = data.get("decisions", [])
+
+    if any(d.get("status") not in ("approved", "rejected") for d in decisions):
+        return jsonify({"message": "❌ Each decision status must be 'approved' or 'rejected'."}), 400
+
+    conn = get_db_connection()
+    applied = 0
+    if decisions:
+        applied = execute_writes(
+            conn,
+            "UPDATE leave_requests SET status = ? WHERE id = ? AND mentor_id = ? AND status = 'pending'",
+            [(d["status"], d["leave_id"], mentor_id) for d in decisions],
+            "decide_leaves",
+        )
+    requests = fetch_mentor_pending(conn, mentor_id)
+    conn.close()
+
+    icon = "✅" if applied == len(decisions) else "⚠️"
+    return jsonify({
+        "message": f"{icon} Applied {applied} of {len(decisions)} leave decisions.",
+        "applied": applied,
+        "requests": requests,
+    })
+
 # ✅ Upload AI Training Data (Admin)
 @app.route("/upload-data", methods=["POST"])
 def upload_ai_data():
@@ -194,20 +295,24 @@ def upload_ai_data():
     try:
         if filename.endswith(".csv") or filename.endswith(".xlsx"):
             df = pd.read_csv(file) if filename.endswith(".csv") else pd.read_excel(file)
-            for _, row in df.iterrows():
-                cursor.execute("INSERT INTO academic_docs (content) VALUES (?)", (json.dumps(row.to_dict()),))
-            conn.commit()
+            with span("sql", "insert_academic_docs"):
+                for _, row in df.iterrows():
+                    cursor.execute("INSERT INTO academic_docs (content) VALUES (?)", (json.dumps(row.to_dict()),))
+                conn.commit()
 
         elif filename.endswith(".json"):
             data = json.load(file)
-            cursor.execute("INSERT INTO academic_docs (content) VALUES (?)", (json.dumps(data),))
-            conn.commit()
+            with span("sql", "insert_academic_docs"):
+                cursor.execute("INSERT INTO academic_docs (content) VALUES (?)", (json.dumps(data),))
+                conn.commit()
 
         elif filename.endswith(".pdf"):
-            reader = PyPDF2.PdfReader(file)
-            text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
-            cursor.execute("INSERT INTO academic_docs (content) VALUES (?)", (text,))
-            conn.commit()
+            with span("pdf", "extract_text"):
+                reader = PyPDF2.PdfReader(file)
+                text = "\n".join([page.extract_text() for page in reader.pages if page.extract_text()])
+            with span("sql", "insert_academic_docs"):
+                cursor.execute("INSERT INTO academic_docs (content) VALUES (?)", (text,))
+                conn.commit()
         else:
             return jsonify({"message": "❌ Invalid file format. Supported formats: CSV, XLSX, JSON, PDF"}), 400
 
@@ -226,8 +331,9 @@ def academic_query():
 
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT content FROM academic_docs")
-    documents = cursor.fetchall()
+    with span("sql", "select_academic_docs"):
+        cursor.execute("SELECT content FROM academic_docs")
+        documents = cursor.fetchall()
     conn.close()
 
     if not documents:
@@ -236,13 +342,14 @@ def academic_query():
     knowledge_base = " ".join([doc[0] for doc in documents])[:4000]
 
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are a helpful academic assistant."},
-                {"role": "user", "content": f"{query}\n\nContext:\n{knowledge_base}"}
-            ],
-            model="llama-3.3-70b-versatile",
-        )
+        with span("llm", "chat_completion"):
+            chat_completion = client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": "You are a helpful academic assistant."},
+                    {"role": "user", "content": f"{query}\n\nContext:\n{knowledge_base}"}
+                ],
+                model="llama-3.3-70b-versatile",
+            )
 
         ai_response = chat_completion.choices[0].message.content
         return jsonify({"response": ai_response})
@@ -270,11 +377,12 @@ def set_template():
     # Update the database
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute(
-        "INSERT OR REPLACE INTO certificate_templates (template_type, file_path) VALUES (?, ?)",
-        (template_type, template_path)
-    )
-    conn.commit()
+    with span("sql", "upsert_template"):
+        cursor.execute(
+            "INSERT OR REPLACE INTO certificate_templates (template_type, file_path) VALUES (?, ?)",
+            (template_type, template_path)
+        )
+        conn.commit()
     conn.close()
 
     return jsonify({"message": f"✅ {template_type} template updated successfully."})
@@ -304,8 +412,9 @@ def generate_certificate():
         # Check if there's a stored template
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT file_path FROM certificate_templates WHERE template_type = ?", (cert_type,))
-        template_record = cursor.fetchone()
+        with span("sql", "select_template"):
+            cursor.execute("SELECT file_path FROM certificate_templates WHERE template_type = ?", (cert_type,))
+            template_record = cursor.fetchone()
         conn.close()
 
         if template_record and os.path.exists(template_record["file_path"]):
@@ -315,92 +424,15 @@ def generate_certificate():
         else:
             custom_template = False
 
-    # Create the certificate file path
+    # Certificates come from a precompiled layout per cert_type/template; only the student id and date change
     filename = f"{student_id}_{cert_type.lower()}_certificate.pdf"
-    filepath = os.path.join(os.getcwd(), filename)
+    current_date = datetime.date.today().strftime("%d-%m-%Y")
 
-    if custom_template:
-        # Save the template temporarily to use it
-        temp_template_path = os.path.join(os.getcwd(), "temp_template.pdf")
-        with open(temp_template_path, "wb") as f:
-            f.write(template_data)
-
-        # Use PyPDF2 to modify the template
-        reader = PyPDF2.PdfReader(temp_template_path)
-        writer = PyPDF2.PdfWriter()
-
-        # Get the first page
-        page = reader.pages[0]
-
-        # Create a new PDF to overlay the data
-        overlay_bytes = io.BytesIO()
-        c = canvas.Canvas(overlay_bytes)
-
-        # Add the certificate data
-        c.setFont("Helvetica", 12)
-        c.drawString(100, 400, f"Student ID: {student_id}")
-        c.drawString(100, 380, f"Certificate Type: {cert_type}")
-        current_date = datetime.date.today().strftime("%d-%m-%Y")
-        c.drawString(100, 360, f"Date Issued: {current_date}")
-        c.save()
-
-        # Create a new PDF reader from the overlay data
-        overlay_bytes.seek(0)
-        overlay_pdf = PyPDF2.PdfReader(overlay_bytes)
-
-        # Merge the template with the overlay
-        page.merge_page(overlay_pdf.pages[0])
-        writer.add_page(page)
-
-        # Save the merged PDF
-        with open(filepath, "wb") as output_file:
-            writer.write(output_file)
-
-        # Clean up the temporary template
-        if os.path.exists(temp_template_path):
-            os.remove(temp_template_path)
-
-    else:
-        # Generate a standard certificate
-        c = canvas.Canvas(filepath)
-
-        # Set up the certificate
-        c.setTitle(f"{cert_type} Certificate")
-        c.setFont("Helvetica-Bold", 24)
-
-        # Certificate header
-        c.drawCentredString(300, 750, "ACADEMIC INSTITUTION")
-        c.setFont("Helvetica-Bold", 22)
-        c.drawCentredString(300, 700, f"{cert_type} Certificate")
-
-        # Certificate content
-        c.setFont("Helvetica", 14)
-        current_date = datetime.date.today().strftime("%d-%m-%Y")
-
-        if cert_type == "Bonafide":
-            c.drawString(50, 600, f"This is to certify that {student_id} is a bonafide student")
-            c.drawString(50, 580, "of our institution and is currently pursuing their education with us.")
-        elif cert_type == "NOC":
-            c.drawString(50, 600, f"This is to certify that {student_id} is granted a No Objection")
-            c.drawString(50, 580, "Certificate for their intended activities outside the institution.")
-
-        # Footer
-        c.drawString(50, 400, f"Date: {current_date}")
-        c.drawString(400, 400, "Signature")
-        c.drawString(400, 380, "________________")
-        c.drawString(400, 360, "Principal")
-
-        # Add a border
-        c.rect(20, 20, 555, 800, stroke=1, fill=0)
-
-        # Save the PDF
-        c.save()
-
-    # Send the file
     try:
-        return send_file(filepath, as_attachment=True)
+        pdf_bytes = generate_certificate_pdf(student_id, cert_type, current_date, template_data if custom_template else None)
+        return send_file(io.BytesIO(pdf_bytes), as_attachment=True, download_name=filename, mimetype="application/pdf")
     except Exception as e:
-        return jsonify({"message": f"❌ Error generating certificate: {str(e)}"}),
+        return jsonify({"message": f"❌ Error generating certificate: {str(e)}"}), 500
 # ✅ Run Server
 if __name__ == "__main__":
     app.run(debug=True)
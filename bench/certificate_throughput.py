@@ -0,0 +1,57 @@
+# Certificates per second per core: reportlab-per-request vs the precompiled layout.
+#
+#   python -m bench.certificate_throughput --iterations 500
+#
+# Runs single-threaded, so the rates are per core.
+import argparse
+import datetime
+import time
+
+from bench.load_test import make_template_pdf
+from certificates import get_certificate_layout, render_certificate
+
+
+def measure(render, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        render(f"student{i}")
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare certificate rendering throughput per core.")
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    current_date = datetime.date.today().strftime("%d-%m-%Y")
+    template_pdf = make_template_pdf()
+    cases = (
+        ("Bonafide (no template)", "Bonafide", None),
+        ("NOC (no template)", "NOC", None),
+        ("NOC (stored template)", "NOC", template_pdf),
+    )
+
+    print(f"{'Layout':<26}{'reportlab/s':>14}{'precompiled/s':>16}{'speedup':>10}")
+    for label, cert_type, template_data in cases:
+        layout = get_certificate_layout(cert_type, template_data)
+        if layout is None:
+            print(f"{label:<26}  no precompiled layout available")
+            continue
+
+        def slow(student_id):
+            return render_certificate(student_id, cert_type, current_date, template_data)
+
+        def fast(student_id):
+            return layout.render(student_id, current_date)
+
+        # Warm up imports, font metrics and allocator before timing
+        slow("warmup")
+        fast("warmup")
+
+        slow_rate = measure(slow, args.iterations)
+        fast_rate = measure(fast, args.iterations)
+        print(f"{label:<26}{slow_rate:>14.1f}{fast_rate:>16.1f}{fast_rate / slow_rate:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
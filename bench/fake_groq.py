@@ -0,0 +1,106 @@
+# Local stand-in for the Groq chat-completions API.
+#
+#   python -m bench.fake_groq --port 8090 --latency-ms 800 --jitter-ms 200
+#
+# Start the backend with GROQ_BASE_URL=http://127.0.0.1:8090 and any GROQ_API_KEY;
+# the Groq SDK then sends /academic traffic here instead of api.groq.com.
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHAT_COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+
+def make_handler(latency_ms, jitter_ms, error_rate, rng):
+    rng_lock = threading.Lock()
+
+    class FakeGroqHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request_body = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path != CHAT_COMPLETIONS_PATH:
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+                return
+
+            with rng_lock:
+                delay = max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000 if jitter_ms else latency_ms / 1000
+                fail = rng.random() < error_rate
+            time.sleep(delay)
+
+            if fail:
+                self._send_json(503, {"error": {"message": "Injected failure", "type": "service_unavailable"}})
+                return
+
+            messages = request_body.get("messages", [])
+            prompt = messages[-1]["content"] if messages else ""
+            prompt_tokens = len(prompt.split())
+            content = f"Stub answer for: {prompt.splitlines()[0][:200] if prompt else ''}"
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request_body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "logprobs": None,
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(content.split()),
+                    "total_tokens": prompt_tokens + len(content.split()),
+                },
+            })
+
+    return FakeGroqHandler
+
+
+def serve(host, port, latency_ms, jitter_ms=0.0, error_rate=0.0, seed=0):
+    handler = make_handler(latency_ms, jitter_ms, error_rate, random.Random(seed))
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Groq chat-completions endpoint with configurable latency.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with HTTP 503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    print(f"✅ Fake Groq listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency_ms}±{args.jitter_ms} ms, error rate {args.error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Synthetic data generator for benchmarking.
+#
+#   python -m bench.generate_data --db bench.db --students 5000 --mentors 100 --leaves-per-student 4 --docs 2000
+#
+# Students are named student<N> and mentors mentor<N>, which is what bench.load_test expects.
+import argparse
+import datetime
+import json
+import os
+import random
+
+STATUSES = ("pending", "approved", "rejected")
+SUBJECTS = ("Mathematics", "Physics", "Chemistry", "Computer Science", "Economics", "History")
+
+
+def student_name(i):
+    return f"student{i}"
+
+
+def mentor_name(i):
+    return f"mentor{i}"
+
+
+def mentor_rows(students, mentors, rng):
+    for i in range(students):
+        yield student_name(i), mentor_name(rng.randrange(mentors))
+
+
+# Leaves over 5 days go to the student's assigned mentor, as backend.py's /leave does
+def leave_rows(assignments, leaves_per_student, rng):
+    today = datetime.date.today()
+    for student_id, assigned_mentor in assignments:
+        for _ in range(leaves_per_student):
+            days = rng.randint(1, 30)
+            start = today - datetime.timedelta(days=rng.randint(0, 365))
+            end = start + datetime.timedelta(days=days)
+            if days <= 5:
+                mentor_id, status = "Auto-Approved", "approved"
+            else:
+                mentor_id, status = assigned_mentor, rng.choice(STATUSES)
+            yield (student_id, mentor_id, days, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), status)
+
+
+def doc_rows(docs, rng):
+    for i in range(docs):
+        subject = rng.choice(SUBJECTS)
+        yield (json.dumps({
+            "course": f"{subject} {100 + i % 400}",
+            "credits": rng.randint(1, 5),
+            "syllabus": f"Unit {rng.randint(1, 8)} of {subject} covers topic {i} in depth.",
+        }),)
+
+
+def generate(db_path, students, mentors, leaves_per_student, docs, seed=0, batch_size=10000):
+    # backend creates the schema on import; point it at the target database first
+    os.environ["LEAVE_DB_PATH"] = db_path
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    import backend
+
+    rng = random.Random(seed)
+    conn = backend.get_db_connection()
+    cursor = conn.cursor()
+
+    def insert(sql, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(sql, batch)
+                batch.clear()
+        if batch:
+            cursor.executemany(sql, batch)
+
+    assignments = list(mentor_rows(students, mentors, rng))
+    insert("INSERT OR REPLACE INTO mentor_assignments (student_id, mentor_id) VALUES (?, ?)", assignments)
+    insert("""
+        INSERT INTO leave_requests (student_id, mentor_id, days, start_date, end_date, status)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, leave_rows(assignments, leaves_per_student, rng))
+    insert("INSERT INTO academic_docs (content) VALUES (?)", doc_rows(docs, rng))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the leave management database with synthetic data.")
+    parser.add_argument("--db", default="bench.db", help="SQLite file to populate (default: bench.db)")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--mentors", type=int, default=50)
+    parser.add_argument("--leaves-per-student", type=int, default=3)
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate(args.db, args.students, args.mentors, args.leaves_per_student, args.docs, args.seed)
+    print(f"✅ Wrote {args.students} students, {args.mentors} mentors, "
+          f"{args.students * args.leaves_per_student} leave requests and {args.docs} docs to {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# Load driver for every route in backend.py.
+#
+#   python -m bench.generate_data --db bench.db
+#   python -m bench.fake_groq --latency-ms 500 &
+#   rm -rf bench_metrics && LEAVE_METRICS_DIR=bench_metrics LEAVE_DB_PATH=bench.db LEAVE_TEMPLATES_DIR=bench_templates \
+#       GROQ_API_KEY=bench GROQ_BASE_URL=http://127.0.0.1:8090 GROQ_MAX_RETRIES=0 gunicorn -w 4 backend:app &
+#   python -m bench.load_test --base-url http://127.0.0.1:8000 --requests 500 --concurrency 16
+#
+# Each endpoint is driven in its own phase so its throughput and latency
+# percentiles are not skewed by the others. --students/--mentors/--leaves
+# must match the numbers given to bench.generate_data. LEAVE_METRICS_DIR lets
+# /metrics merge all four workers, whichever one answers the scrape.
+# LEAVE_TEMPLATES_DIR keeps the /set-template phase from overwriting the real NOC
+# template, and GROQ_MAX_RETRIES=0 makes every --error-rate failure reach the report.
+import argparse
+import io
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from bench.generate_data import mentor_name, student_name
+
+
+def make_template_pdf():
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    c.setFont("Helvetica-Bold", 20)
+    c.drawCentredString(300, 750, "BENCHMARK TEMPLATE")
+    c.rect(20, 20, 555, 800, stroke=1, fill=0)
+    c.save()
+    return buffer.getvalue()
+
+
+def make_training_csv(rows=20):
+    lines = ["course,credits,syllabus"]
+    lines += [f"Course {i},{i % 5 + 1},Benchmark syllabus row {i}" for i in range(rows)]
+    return "\n".join(lines).encode("utf-8")
+
+
+class Workload:
+    def __init__(self, base_url, students, mentors, leaves, seed, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.students = students
+        self.mentors = mentors
+        self.leaves = leaves
+        self.template_pdf = make_template_pdf()
+        self.training_csv = make_training_csv()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._pending = []
+
+    def _pick(self):
+        with self._rng_lock:
+            return (
+                student_name(self._rng.randrange(self.students)),
+                mentor_name(self._rng.randrange(self.mentors)),
+                self._rng.randint(1, max(self.leaves, 1)),
+                self._rng.randint(1, 30),
+                self._rng.random(),
+            )
+
+    def url(self, path):
+        return self.base_url + path
+
+    # ✅ One request builder per route
+    def assign_mentor(self, session):
+        student, mentor, _, _, _ = self._pick()
+        return session.post(self.url("/assign-mentor"), json={"student_id": student, "mentor_id": mentor}, timeout=self.timeout)
+
+    def leave(self, session):
+        student, _, _, days, _ = self._pick()
+        return session.post(self.url("/leave"), json={"student_id": student, "days": days}, timeout=self.timeout)
+
+    def student_leave_status(self, session):
+        student, _, _, _, _ = self._pick()
+        return session.get(self.url("/student-leave-status"), params={"student_id": student}, timeout=self.timeout)
+
+    def mentor_leave_requests(self, session):
+        _, mentor, _, _, _ = self._pick()
+        return session.get(self.url("/mentor-leave-requests"), params={"mentor_id": mentor}, timeout=self.timeout)
+
+    def approve_leave(self, session):
+        _, _, leave_id, _, _ = self._pick()
+        return session.post(self.url("/approve-leave"), json={"leave_id": leave_id}, timeout=self.timeout)
+
+    def reject_leave(self, session):
+        _, _, leave_id, _, _ = self._pick()
+        return session.post(self.url("/reject-leave"), json={"leave_id": leave_id}, timeout=self.timeout)
+
+    # Decisions are only timed against (mentor, leave id) pairs that are really pending, so each
+    # request changes a row instead of measuring an UPDATE that matches nothing
+    def load_pending(self, session):
+        pending = []
+        for i in range(self.mentors):
+            mentor = mentor_name(i)
+            response = session.get(self.url("/mentor-leave-requests"), params={"mentor_id": mentor}, timeout=self.timeout)
+            response.raise_for_status()
+            pending += [(mentor, req["id"]) for req in response.json()["requests"]]
+        with self._rng_lock:
+            self._rng.shuffle(pending)
+            self._pending = pending
+        return len(pending)
+
+    def leave_decisions(self, session):
+        _, mentor, leave_id, _, coin = self._pick()
+        with self._rng_lock:
+            if self._pending:
+                mentor, leave_id = self._pending.pop()
+        decisions = [{"leave_id": leave_id, "status": "approved" if coin < 0.5 else "rejected"}]
+        return session.post(self.url("/leave-decisions"), json={"mentor_id": mentor, "decisions": decisions}, timeout=self.timeout)
+
+    def upload_data(self, session):
+        files = {"file": ("bench.csv", self.training_csv, "text/csv")}
+        return session.post(self.url("/upload-data"), files=files, timeout=self.timeout)
+
+    def academic(self, session):
+        student, _, _, _, _ = self._pick()
+        return session.post(self.url("/academic"), json={"student_id": student, "query": "Summarise the syllabus."}, timeout=self.timeout)
+
+    def set_template(self, session):
+        files = {"template": ("noc_template.pdf", self.template_pdf, "application/pdf")}
+        return session.post(self.url("/set-template"), files=files, data={"template_type": "NOC"}, timeout=self.timeout)
+
+    def certificate(self, session):
+        student, _, _, _, coin = self._pick()
+        # Bonafide has no stored template (rendered from scratch), NOC uses the overlay path
+        cert_type = "NOC" if coin < 0.5 else "Bonafide"
+        return session.post(self.url("/certificate"), json={"student_id": student, "cert_type": cert_type}, timeout=self.timeout)
+
+    def metrics(self, session):
+        return session.get(self.url("/metrics"), timeout=self.timeout)
+
+
+# /academic turns LLM failures into HTTP 200 with an error string
+def ai_error(response):
+    return response.json().get("response", "").startswith("❌ AI Error")
+
+
+RESPONSE_CHECKS = {"/academic": ai_error}
+
+# Ordered so /set-template runs before /certificate needs it
+ENDPOINTS = (
+    ("/assign-mentor", "assign_mentor"),
+    ("/leave", "leave"),
+    ("/student-leave-status", "student_leave_status"),
+    ("/mentor-leave-requests", "mentor_leave_requests"),
+    ("/approve-leave", "approve_leave"),
+    ("/reject-leave", "reject_leave"),
+    ("/leave-decisions", "leave_decisions"),
+    ("/upload-data", "upload_data"),
+    ("/academic", "academic"),
+    ("/set-template", "set_template"),
+    ("/certificate", "certificate"),
+    ("/metrics", "metrics"),
+)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_phase(send, total, concurrency, check=None):
+    local = threading.local()
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = send(session)
+            response.content
+            failed = response.status_code >= 400 or (check is not None and check(response))
+        except (requests.RequestException, ValueError):
+            failed = True
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if failed:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": wall,
+        "throughput": total / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def print_report(results, concurrency):
+    print(f"\nConcurrency: {concurrency}")
+    print(f"{'Endpoint':<24}{'Reqs':>7}{'Errors':>8}{'Req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for path, r in results.items():
+        print(f"{path:<24}{r['requests']:>7}{r['errors']:>8}{r['throughput']:>10.1f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive every backend route and report throughput and latency percentiles.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--mentors", type=int, default=50)
+    parser.add_argument("--leaves", type=int, default=3000, help="Highest leave id to approve/reject")
+    parser.add_argument("--only", nargs="*", help="Restrict the run to these endpoint paths")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    workload = Workload(args.base_url, args.students, args.mentors, args.leaves, args.seed, args.timeout)
+    results = {}
+    for path, method in ENDPOINTS:
+        if args.only and path not in args.only:
+            continue
+        if path == "/leave-decisions":
+            pending = workload.load_pending(requests.Session())
+            if pending < args.requests:
+                print(f"⚠️ Only {pending} pending leaves; the remaining /leave-decisions requests pick random pairs")
+        results[path] = run_phase(getattr(workload, method), args.requests, args.concurrency, RESPONSE_CHECKS.get(path))
+
+    print_report(results, args.concurrency)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"concurrency": args.concurrency, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import datetime
+import io
+import os
+import re
+from functools import lru_cache
+
+import PyPDF2
+from reportlab.pdfgen import canvas
+
+from metrics import span
+
+# Placeholders drawn into the precompiled layout. The trailing padding reserves room in the
+# content stream so a real value can be spliced in without moving any byte offsets. They are
+# alphanumeric only because PyPDF2 octal-escapes every other character when it rewrites a merged page.
+STUDENT_ID_PLACEHOLDER = "QQSTUDENTIDQQ" + "X" * 51
+DATE_PLACEHOLDER = "QQDATEQQXX"
+
+_STRING_TAIL = re.compile(rb"\s*Tj")
+# Per-document metadata reportlab writes into the Info dict and trailer; refilled per request
+# so certificates don't share one /ID and a /CreationDate frozen at compile time
+_INFO_DATE = re.compile(rb"/(?:CreationDate|ModDate)\s*(\(D:[^)]*\))")
+_TRAILER_ID = re.compile(rb"/ID\s*\[\s*<([0-9a-fA-F]{32})>\s*<([0-9a-fA-F]{32})>\s*\]")
+
+
+# ✅ Reportlab render (used per request when no precompiled layout fits)
+def render_certificate(student_id, cert_type, current_date, template_data=None, page_compression=None):
+    if template_data is not None:
+        # Use PyPDF2 to modify the template
+        with span("pdf", "load_template"):
+            reader = PyPDF2.PdfReader(io.BytesIO(template_data))
+            writer = PyPDF2.PdfWriter()
+
+            # Get the first page
+            page = reader.pages[0]
+
+        # Create a new PDF to overlay the data
+        with span("pdf", "render_overlay"):
+            overlay_bytes = io.BytesIO()
+            c = canvas.Canvas(overlay_bytes, pageCompression=page_compression)
+
+            # Add the certificate data
+            c.setFont("Helvetica", 12)
+            c.drawString(100, 400, f"Student ID: {student_id}")
+            c.drawString(100, 380, f"Certificate Type: {cert_type}")
+            c.drawString(100, 360, f"Date Issued: {current_date}")
+            c.save()
+
+        # Merge the template with the overlay
+        with span("pdf", "merge_overlay"):
+            overlay_bytes.seek(0)
+            overlay_pdf = PyPDF2.PdfReader(overlay_bytes)
+            page.merge_page(overlay_pdf.pages[0])
+            writer.add_page(page)
+
+            output = io.BytesIO()
+            writer.write(output)
+        return output.getvalue()
+
+    # Generate a standard certificate
+    with span("pdf", "render_certificate"):
+        output = io.BytesIO()
+        c = canvas.Canvas(output, pageCompression=page_compression)
+
+        # Set up the certificate
+        c.setTitle(f"{cert_type} Certificate")
+        c.setFont("Helvetica-Bold", 24)
+
+        # Certificate header
+        c.drawCentredString(300, 750, "ACADEMIC INSTITUTION")
+        c.setFont("Helvetica-Bold", 22)
+        c.drawCentredString(300, 700, f"{cert_type} Certificate")
+
+        # Certificate content
+        c.setFont("Helvetica", 14)
+
+        if cert_type == "Bonafide":
+            c.drawString(50, 600, f"This is to certify that {student_id} is a bonafide student")
+            c.drawString(50, 580, "of our institution and is currently pursuing their education with us.")
+        elif cert_type == "NOC":
+            c.drawString(50, 600, f"This is to certify that {student_id} is granted a No Objection")
+            c.drawString(50, 580, "Certificate for their intended activities outside the institution.")
+
+        # Footer
+        c.drawString(50, 400, f"Date: {current_date}")
+        c.drawString(400, 400, "Signature")
+        c.drawString(400, 380, "________________")
+        c.drawString(400, 360, "Principal")
+
+        # Add a border
+        c.rect(20, 20, 555, 800, stroke=1, fill=0)
+
+        # Save the PDF
+        c.save()
+    return output.getvalue()
+
+
+def _escape_pdf_text(value):
+    # Only printable ASCII is spliced in; anything else goes through reportlab so encoding matches
+    if not all(32 <= ord(ch) < 127 for ch in value):
+        return None
+    return value.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("ascii")
+
+
+def _find_unescaped(data, char, start, step):
+    i = start
+    while 0 <= i < len(data):
+        if data[i:i + 1] == char and data[i - 1:i] != b"\\":
+            return i
+        i += step
+    return -1
+
+
+# A rendered certificate whose variable text runs are located once, so each request
+# only overwrites those byte ranges. Every '(...) Tj' string holding a placeholder is a
+# slot, as are the Info dates and trailer /ID; the new string is padded with spaces
+# after ')' so the stream length, /Length and xref offsets never change.
+class CertificateLayout:
+    def __init__(self, pdf, slots):
+        self.pdf = pdf
+        self.slots = slots
+
+    @classmethod
+    def compile(cls, cert_type, template_data=None):
+        with span("pdf", "compile_layout"):
+            pdf = render_certificate(
+                STUDENT_ID_PLACEHOLDER, cert_type, DATE_PLACEHOLDER, template_data, page_compression=0
+            )
+            slots = []
+            for field, placeholder in (("student_id", STUDENT_ID_PLACEHOLDER), ("date", DATE_PLACEHOLDER)):
+                marker = placeholder.encode("ascii")
+                pos = pdf.find(marker)
+                while pos != -1:
+                    start = _find_unescaped(pdf, b"(", pos - 1, -1)
+                    end = _find_unescaped(pdf, b")", pos + len(marker), 1)
+                    if start == -1 or end == -1 or not _STRING_TAIL.match(pdf, end + 1):
+                        return None
+                    slots.append((start, end + 1, pdf[start:pos], pdf[pos + len(marker):end + 1], field))
+                    pos = pdf.find(marker, end)
+            # The date is drawn on every layout; if it wasn't found the streams came out compressed
+            if not any(slot[4] == "date" for slot in slots):
+                return None
+            for match in _INFO_DATE.finditer(pdf):
+                slots.append((match.start(1), match.end(1), b"(", b")", "pdf_date"))
+            for match in _TRAILER_ID.finditer(pdf):
+                slots.append((match.start(1), match.end(1), b"", b"", "doc_id"))
+                slots.append((match.start(2), match.end(2), b"", b"", "doc_id"))
+            return cls(pdf, slots)
+
+    def render(self, student_id, current_date):
+        values = {
+            "student_id": _escape_pdf_text(student_id),
+            "date": _escape_pdf_text(current_date),
+            # The UTC form is the shortest PDF date, so it fits any slot reportlab wrote
+            "pdf_date": datetime.datetime.now(datetime.timezone.utc).strftime("D:%Y%m%d%H%M%SZ").encode("ascii"),
+            "doc_id": os.urandom(16).hex().encode("ascii"),
+        }
+        if None in values.values():
+            return None
+        output = bytearray(self.pdf)
+        for start, end, prefix, suffix, field in self.slots:
+            text = prefix + values[field] + suffix
+            if len(text) > end - start:
+                return None
+            output[start:end] = text.ljust(end - start, b" ")
+        return bytes(output)
+
+
+# Layouts are keyed on the template bytes, so re-uploading a template compiles a fresh one
+@lru_cache(maxsize=32)
+def get_certificate_layout(cert_type, template_data=None):
+    return CertificateLayout.compile(cert_type, template_data)
+
+
+def generate_certificate_pdf(student_id, cert_type, current_date, template_data=None):
+    layout = get_certificate_layout(cert_type, template_data)
+    if layout is not None:
+        with span("pdf", "render_precompiled"):
+            pdf = layout.render(student_id, current_date)
+        if pdf is not None:
+            return pdf
+    return render_certificate(student_id, cert_type, current_date, template_data)
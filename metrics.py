@@ -0,0 +1,267 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+# Latency buckets in seconds, covering fast SQLite lookups up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REGISTRY = []
+
+# Shared by every worker of one deployment (gunicorn -w N): each process periodically
+# writes its values here and /metrics merges all of them, whichever worker answers the
+# scrape. Unset, /metrics only reports the process that serves it.
+METRICS_DIR = os.getenv("LEAVE_METRICS_DIR")
+FLUSH_INTERVAL = float(os.getenv("LEAVE_METRICS_FLUSH_SECONDS", "1"))
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    escaped = [(k, str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(k), v] for k, v in self._values.items()]
+
+    def merge(self, snapshots):
+        values = {}
+        for snapshot in snapshots:
+            for label_values, value in snapshot:
+                key = tuple(label_values)
+                values[key] = values.get(key, 0) + value
+        return values
+
+    def render(self, values):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def render(self, values):
+        lines = super().render(values)
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(k), list(v[0]), v[1], v[2]] for k, v in self._series.items()]
+
+    def merge(self, snapshots):
+        series = {}
+        for snapshot in snapshots:
+            for label_values, counts, total, count in snapshot:
+                merged = series.setdefault(tuple(label_values), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+        return series
+
+    def render(self, series):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, label_values, ("le", bound))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# ✅ Metrics exposed on /metrics
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served.", ("route",))
+REQUEST_ERRORS = Counter("http_request_errors_total", "HTTP requests that raised or returned a 5xx status.", ("method", "route"))
+
+SPAN_LATENCY = Histogram("span_duration_seconds", "Latency of timed operations (sql, llm, pdf).", ("kind", "operation"))
+SPANS_IN_FLIGHT = Gauge("span_in_flight", "Timed operations currently running.", ("kind",))
+SPAN_ERRORS = Counter("span_errors_total", "Timed operations that raised an exception.", ("kind", "operation"))
+
+
+@contextmanager
+def span(kind, operation):
+    SPANS_IN_FLIGHT.inc(kind)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SPAN_ERRORS.inc(kind, operation)
+        raise
+    finally:
+        SPAN_LATENCY.observe(time.perf_counter() - start, kind, operation)
+        SPANS_IN_FLIGHT.dec(kind)
+
+
+def _snapshot():
+    return {metric.name: metric.snapshot() for metric in REGISTRY}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class _ProcessFile:
+    # One JSON file per process lifetime. The random token keeps a restarted worker that
+    # reuses a pid from overwriting the totals its predecessor left behind.
+    def __init__(self):
+        self.pid = os.getpid()
+        self.path = os.path.join(METRICS_DIR, f"metrics_{self.pid}_{uuid.uuid4().hex[:8]}.json")
+        self._stop = threading.Event()
+
+    def write(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"pid": self.pid, "metrics": _snapshot()}, f)
+        os.replace(tmp_path, self.path)
+
+    def _loop(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            try:
+                self.write()
+            except OSError:
+                pass
+
+    def start(self):
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        threading.Thread(target=self._loop, name="metrics-flush", daemon=True).start()
+        atexit.register(self.write)
+
+
+_process_file = None
+_process_file_lock = threading.Lock()
+
+
+def _ensure_process_file():
+    # Started lazily per process, so workers forked after import (gunicorn --preload) get their own file
+    global _process_file
+    if METRICS_DIR is None or (_process_file is not None and _process_file.pid == os.getpid()):
+        return
+    with _process_file_lock:
+        if _process_file is None or _process_file.pid != os.getpid():
+            _process_file = _ProcessFile()
+            _process_file.start()
+
+
+def _other_processes():
+    own_path = _process_file.path if _process_file is not None else None
+    for path in glob.glob(os.path.join(METRICS_DIR, "metrics_*.json")):
+        if path == own_path:
+            continue
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        yield data["pid"], data["metrics"]
+
+
+def render():
+    # This process contributes its live values; every other process its last flushed file.
+    # Files of exited workers keep counting towards counters and histograms so totals never
+    # go backwards, but their gauges are dropped since nothing of theirs is still in flight.
+    others = list(_other_processes()) if METRICS_DIR is not None else []
+    lines = []
+    for metric in REGISTRY:
+        snapshots = [metric.snapshot()]
+        for pid, data in others:
+            if metric.name in data and (not isinstance(metric, Gauge) or _pid_alive(pid)):
+                snapshots.append(data[metric.name])
+        lines.extend(metric.render(metric.merge(snapshots)))
+    return "\n".join(lines) + "\n"
+
+
+def _route():
+    # Use the URL rule rather than the raw path so label cardinality stays bounded
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+# With several workers, set LEAVE_METRICS_DIR to a directory they all share and empty it
+# before each deployment starts, so /metrics reports the whole server rather than one worker.
+def init_app(app):
+    @app.before_request
+    def _start_request_timer():
+        _ensure_process_file()
+        g.metrics_start = time.perf_counter()
+        g.metrics_route = _route()
+        REQUESTS_IN_FLIGHT.inc(g.metrics_route)
+
+    @app.after_request
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _observe_request(exc):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return
+        route = g.pop("metrics_route")
+        status = g.pop("metrics_status", 500)
+        REQUESTS_IN_FLIGHT.dec(route)
+        REQUEST_LATENCY.observe(time.perf_counter() - start, request.method, route, str(status))
+        if exc is not None or status >= 500:
+            REQUEST_ERRORS.inc(request.method, route)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_endpoint():
+        return Response(render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,155 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import span
+
+
+# Funnels writes from many request threads through one connection. Writes that queue up
+# while a commit is running, or within window_ms of each other once a burst is under way,
+# are committed in a single transaction, so a burst pays for one lock acquisition and one
+# fsync instead of one per request. A lone write is committed straight away. Each write
+# runs inside its own savepoint, so a failing statement only fails its own caller.
+# Grouping only happens between threads of one process: under sync workers every write
+# is a batch of one.
+class GroupCommitWriter:
+    def __init__(self, db_path, window_ms=5, max_batch=500):
+        self.db_path = db_path
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def _ensure_started(self):
+        # Started lazily and per process, so forking servers (gunicorn --preload) get their own
+        # writer thread; a writer that died is replaced instead of leaving callers to time out
+        if self._running():
+            return
+        with self._start_lock:
+            if not self._running():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, sql, params=()):
+        return self._put(sql, params, False)
+
+    # Queue several parameter sets as one unit: they share a savepoint and always land in the
+    # same group commit, all or nothing. The future resolves to the total rowcount.
+    def submit_many(self, sql, params_list):
+        return self._put(sql, list(params_list), True)
+
+    def _put(self, sql, params, many):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((sql, params, many, future))
+        return future
+
+    # Queue a write and block until it is committed; returns the row id it assigned.
+    # A concurrent.futures.TimeoutError means the outcome is unknown, not that the write
+    # failed: it is still queued and may commit afterwards, so callers must not blindly retry.
+    def execute(self, sql, params=(), timeout=10):
+        return self.submit(sql, params).result(timeout=timeout)
+
+    def close(self):
+        if self._thread is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        # Only hold the batch open for window_ms when other writes were already waiting;
+        # with nothing else in flight the wait would just add latency to a batch of one
+        deadline = time.monotonic() + self.window if not self._queue.empty() else 0
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        return conn
+
+    def _run(self):
+        conn = None
+        try:
+            while True:
+                batch = self._collect()
+                if batch is None:
+                    return
+                try:
+                    if conn is None:
+                        conn = self._connect()
+                    ok = self._commit_batch(conn, batch)
+                except Exception as e:
+                    self._fail(batch, e)
+                    ok = False
+                if not ok and conn is not None:
+                    # Start the next batch on a fresh connection in case this one is unusable
+                    conn.close()
+                    conn = None
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _fail(self, batch, error):
+        for _, _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _commit_batch(self, conn, batch):
+        results = []
+        try:
+            with span("sql", "group_commit"):
+                conn.execute("BEGIN IMMEDIATE")
+                for sql, params, many, _ in batch:
+                    conn.execute("SAVEPOINT queued_write")
+                    try:
+                        if many:
+                            results.append((conn.executemany(sql, params).rowcount, None))
+                        else:
+                            results.append((conn.execute(sql, params).lastrowid, None))
+                        conn.execute("RELEASE queued_write")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO queued_write")
+                        conn.execute("RELEASE queued_write")
+                        results.append((None, e))
+                conn.execute("COMMIT")
+        except Exception as e:
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            self._fail(batch, e)
+            return False
+
+        # Acknowledge only after COMMIT returns, so every caller's write is durable
+        for (_, _, _, future), (row_id, error) in zip(batch, results):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(row_id)
+        return True